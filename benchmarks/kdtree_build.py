@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""Measure KDTree build (sort) time for synthetic catalogs of
+uniformly distributed stars, from 100k up to 5M stars, with different
+numbers of threads.
+
+Usage:
+
+    python benchmarks/kdtree_build.py [--sizes 100000 ...] [--threads 1 4 ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from star_database import random_catalog
+
+KDBUCKET_SIZE = 97 # as for cameras/science_cam.yml
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [100000, 300000, 1000000, 3000000, 5000000],
+                        help = 'catalog sizes to measure')
+    parser.add_argument('--threads', type = int, nargs = '+', default = sorted(set([1, os.cpu_count() or 1])),
+                        help = 'thread counts to measure')
+    args = parser.parse_args()
+
+    from starlib import StarDatabase, KDTree
+
+    print('{:>10} {:>8} {:>12} {:>14}'.format('stars', 'threads', 'build_s', 'ns_per_star'))
+    for n in args.sizes:
+        positions, fluxes = random_catalog(n)
+        db = StarDatabase()
+        db.add_catalog(1e-4, 1e-4, 1e-8, positions, fluxes,
+                       np.arange(1, n + 1, dtype = np.int32), np.zeros(n, dtype = np.uint8))
+        del positions, fluxes
+        for threads in args.threads:
+            tree = KDTree(db, KDBUCKET_SIZE)
+            tree.sort(threads)
+            print('{:>10} {:>8} {:>12.4f} {:>14.1f}'.format(db.size, threads, tree.build_time, tree.build_time / db.size * 1e9))
+            del tree
+        del db
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Compare frame rate solving images one at a time with Camera.solve()
+against the threaded Pipeline (without dropping frames).
+
+The solver's time budget caps how long a lost-in-space solve may take
+(with the synthetic catalog in data/ the sample images don't solve,
+so every frame uses its whole budget). The pipelined frame rate can
+approach that of the slowest stage only with at least as many free
+cores as stages; os.cpu_count() is printed alongside.
+
+Usage:
+
+    python benchmarks/pipeline.py [--repeat 3] [--time-budget 0.05]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--camera', default = 'cameras/science_cam.yml')
+    parser.add_argument('--images', default = 'images/science_cam_2018-05-08_50ms_gain40/samples')
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--time-budget', type = float, default = 0.05)
+    args = parser.parse_args()
+
+    from starlib import Camera
+    from starlib.solver import Solver
+    from starlib.pipeline import Pipeline, replay
+
+    camera = Camera(args.camera)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        db = camera.filter_catalog(camera.load_catalog(2020))
+    solver    = Solver(camera, db, time_budget = args.time_budget)
+    filenames = sorted(glob.glob(os.path.join(args.images, '*.png'))) * args.repeat
+
+    camera.previous_solution = None
+    start = time.perf_counter()
+    for filename in filenames:
+        camera.solve(filename, solver)
+    sequential = time.perf_counter() - start
+
+    camera.previous_solution = None
+    pipeline = Pipeline(camera, solver, drop_oldest = False)
+    start    = time.perf_counter()
+    frames   = list(pipeline.run(replay(filenames)))
+    pipelined = time.perf_counter() - start
+
+    print('{} frames, {} cpus'.format(len(filenames), os.cpu_count()))
+    print('{:<12} {:>10}'.format('stage', 'median_ms'))
+    for name in ('decode', 'extract', 'solve', 'latency'):
+        print('{:<12} {:>10.2f}'.format(name, np.median([frame.timings[name] for frame in frames]) * 1000))
+    print('{:<12} {:>10} {:>10}'.format('mode', 'total_s', 'frames/s'))
+    print('{:<12} {:>10.3f} {:>10.2f}'.format('sequential', sequential, len(filenames) / sequential))
+    print('{:<12} {:>10.3f} {:>10.2f}'.format('pipelined', pipelined, len(frames) / pipelined))
+
+
+if __name__ == '__main__':
+    main()
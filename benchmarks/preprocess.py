@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Compare per-frame background subtraction and thresholding with
+fresh arrays for every frame (as Image used to do it) against writing
+into reused FrameBuffers, and color against grayscale decoding.
+
+Allocations are counted with tracemalloc, which sees the numpy arrays
+that both numpy and OpenCV's Python bindings return.
+
+Usage:
+
+    python benchmarks/preprocess.py [--camera cameras/science_cam.yml] [--frames 20]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def allocating(camera, image, median_image):
+    image = np.clip(image.astype(np.int16) - median_image, a_min = 0, a_max = 255).astype(np.uint8)
+    grayscale_image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    _, thresholded_image = cv2.threshold(grayscale_image,
+                                         int(camera.threshold_factor * camera.image_variance),
+                                         255,
+                                         cv2.THRESH_BINARY)
+    return grayscale_image, thresholded_image
+
+
+def measure(f, frames):
+    """Median milliseconds and peak MB allocated per frame, after a
+    first frame to warm up."""
+    f(frames[0])
+    times, peaks = [], []
+    for frame in frames:
+        tracemalloc.start()
+        start = time.perf_counter()
+        f(frame)
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return np.median(times) * 1000, np.median(peaks) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--camera', default = 'cameras/science_cam.yml')
+    parser.add_argument('--images', default = 'images/science_cam_2018-05-08_50ms_gain40/samples')
+    parser.add_argument('--frames', type = int, default = 20)
+    args = parser.parse_args()
+
+    from starlib import Camera, Image
+    from starlib.image import find_blobs, frame_buffers, read_image
+
+    camera    = Camera(args.camera)
+    filenames = sorted(glob.glob(os.path.join(args.images, '*.png')))
+    filenames = (filenames * args.frames)[:args.frames]
+    frames    = [read_image(filename) for filename in filenames]
+    median    = camera.median_image
+
+    def reused(frame):
+        buffers = frame_buffers(frame.shape)
+        return Image.threshold(camera, frame, median, buffers)
+
+    def reused_blobs(frame):
+        buffers = frame_buffers(frame.shape)
+        grayscale, thresholded = Image.threshold(camera, frame, median, buffers)
+        return find_blobs(thresholded, grayscale, labels = buffers.labels)
+
+    def allocating_blobs(frame):
+        grayscale, thresholded = allocating(camera, frame, median)
+        return find_blobs(thresholded, grayscale)
+
+    rows = [('threshold_alloc',  measure(lambda frame: allocating(camera, frame, median), frames)),
+            ('threshold_reused', measure(reused, frames)),
+            ('blobs_alloc',      measure(allocating_blobs, frames)),
+            ('blobs_reused',     measure(reused_blobs, frames)),
+            ('decode_color',     measure(lambda filename: read_image(filename), filenames)),
+            ('decode_gray',      measure(lambda filename: read_image(filename, grayscale = True), filenames))]
+
+    print('{}x{} frames, {} of them'.format(camera.image_width, camera.image_height, len(frames)))
+    print('{:<18} {:>10} {:>12}'.format('stage', 'median_ms', 'peak_MB'))
+    for name, (ms, mb) in rows:
+        print('{:<18} {:>10.2f} {:>12.2f}'.format(name, ms, mb))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Compare full-frame star extraction against extraction from windows
+around the star positions, on a synthetic frame the size of the
+camera's sensor.
+
+Reading (decoding) the file is the same either way, so the processing
+(background subtraction, thresholding and blob measurement) is timed
+on the decoded frame; the end-to-end Image times are shown alongside.
+
+Usage:
+
+    python benchmarks/roi.py [--camera cameras/flircam_jan2020.yml] [--stars 40] [--window 24]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def synthetic_frame(width, height, n, rng):
+    """A noisy color frame with n Gaussian stars; returns the frame and
+    the star positions relative to its center."""
+    frame = rng.normal(4.0, 1.5, size = (height, width)).clip(0, 255)
+    x = rng.uniform(20, width - 20, n)
+    y = rng.uniform(20, height - 20, n)
+    for xx, yy in zip(x, y):
+        x0, y0 = int(xx) - 6, int(yy) - 6
+        gy, gx = np.mgrid[y0:y0 + 13, x0:x0 + 13]
+        frame[y0:y0 + 13, x0:x0 + 13] += 150.0 * np.exp(-((gx - xx) ** 2 + (gy - yy) ** 2) / (2 * 1.2 ** 2))
+    frame = cv2.cvtColor(frame.clip(0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+    return frame, np.stack((x - width / 2.0, y - height / 2.0), axis = 1)
+
+
+def median_seconds(f, repeat):
+    times = []
+    for ii in range(repeat):
+        start = time.perf_counter()
+        result = f()
+        times.append(time.perf_counter() - start)
+    return np.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--camera', default = 'cameras/flircam_jan2020.yml')
+    parser.add_argument('--stars', type = int, default = 40)
+    parser.add_argument('--window', type = int, default = 24, help = 'window size (px)')
+    parser.add_argument('--repeat', type = int, default = 5)
+    args = parser.parse_args()
+
+    from starlib import Camera, Image
+    from starlib.image import find_blobs
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        camera = Camera(args.camera)
+
+    rng = np.random.default_rng(0)
+    frame, positions = synthetic_frame(camera.image_width, camera.image_height, args.stars, rng)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmpdir, 'frame.png')
+        cv2.imwrite(filename, frame)
+        windows = [(x, y, args.window) for x, y in positions]
+
+        full, image   = median_seconds(lambda: Image(camera, 0.0, filename), args.repeat)
+        roi, windowed = median_seconds(lambda: Image(camera, 0.0, filename, windows = windows), args.repeat)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    def full_frame():
+        grayscale, thresholded = Image.threshold(camera, frame, camera.median_image)
+        return find_blobs(thresholded, grayscale)
+
+    full_processing, _ = median_seconds(full_frame, args.repeat)
+    roi_processing, _  = median_seconds(lambda: Image.find_blobs_in_windows(camera, frame, windows), args.repeat)
+
+    print('{}x{} frame, {} stars, {} px windows'.format(camera.image_width, camera.image_height, args.stars, args.window))
+    print('{:<12} {:>8} {:>12} {:>14}'.format('mode', 'stars', 'total_ms', 'processing_ms'))
+    print('{:<12} {:>8} {:>12.2f} {:>14.2f}'.format('full_frame', image.stars.size, full * 1000, full_processing * 1000))
+    print('{:<12} {:>8} {:>12.2f} {:>14.2f}'.format('windows', windowed.stars.size, roi * 1000, roi_processing * 1000))
+    print('processing speedup: {:.1f}x'.format(full_processing / roi_processing))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""Compare memory use and lookup speed of StarDatabase and
+CompactStarDatabase for synthetic catalogs of various sizes.
+
+Each (layout, size) combination is measured in a fresh interpreter.
+Memory is the growth in resident set size (RSS) while building the
+database (for CompactStarDatabase, while freezing an existing
+StarDatabase), so it includes allocator overhead in both cases. For
+large catalogs the compact figure can come out low, because freezing
+reuses heap pages the StarDatabase freed while it was growing;
+CompactStarDatabase.memory_usage() gives the exact size of its arrays.
+
+Usage:
+
+    python benchmarks/star_database.py [--sizes 10000 100000 ...]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+LAYOUTS = ('StarDatabase', 'CompactStarDatabase')
+LOOKUPS = 1000000 # lookups timed in a single native call
+SAMPLES = 10000   # lookups timed one at a time through the bindings
+
+
+def rss():
+    """Current resident set size, in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # peak, on Linux in kB
+
+
+def random_catalog(n, seed = 0):
+    """Uniformly distributed unit vectors and magnitude-like fluxes."""
+    rng       = np.random.RandomState(seed)
+    positions = rng.normal(size = (n, 3))
+    positions /= np.linalg.norm(positions, axis = 1)[:,None]
+    fluxes    = 10.0 ** (-0.4 * rng.uniform(-1.0, 12.0, n))
+    return positions.astype(np.float32), fluxes.astype(np.float32)
+
+
+def measure(layout, n):
+    """Build a database of n random stars with the given layout and
+    time lookups in it; returns a dict of results."""
+    from starlib import StarDatabase
+
+    positions, fluxes = random_catalog(n)
+    ids        = np.arange(1, n + 1, dtype = np.int32)
+    unreliable = np.zeros(n, dtype = np.uint8)
+
+    before = rss()
+    t0 = time.perf_counter()
+    db = StarDatabase()
+    db.add_catalog(1e-4, 1e-4, 1e-8, positions, fluxes, ids, unreliable)
+    build_time = time.perf_counter() - t0
+    if layout == 'CompactStarDatabase':
+        before = rss()
+        t0 = time.perf_counter()
+        db = db.compact()
+        build_time = time.perf_counter() - t0
+    memory = rss() - before
+
+    rng     = np.random.RandomState(1)
+    hashes  = np.array(db.hashes)
+    hits    = hashes[rng.randint(0, db.size, LOOKUPS)]
+    misses  = rng.randint(0, 2**63, LOOKUPS, dtype = np.int64).astype(np.uint64)
+    indices = rng.randint(0, db.size, SAMPLES)
+
+    t0 = time.perf_counter()
+    found = db.find_all(hits)
+    hit_time = time.perf_counter() - t0
+    assert np.all(hashes[found] == hits)
+
+    t0 = time.perf_counter()
+    db.find_all(misses)
+    miss_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for index in indices:
+        db.get_star(int(index))
+    get_star_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for index in indices:
+        db.get_star_by_hash(int(hashes[index]))
+    get_star_by_hash_time = time.perf_counter() - t0
+
+    return {'layout':              layout,
+            'stars':               db.size,
+            'build_s':             build_time,
+            'bytes_per_star':      memory / db.size,
+            'find_hit_ns':         hit_time / LOOKUPS * 1e9,
+            'find_miss_ns':        miss_time / LOOKUPS * 1e9,
+            'get_star_ns':         get_star_time / SAMPLES * 1e9,
+            'get_star_by_hash_ns': get_star_by_hash_time / SAMPLES * 1e9}
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [10000, 100000, 1000000, 3000000],
+                        help = 'catalog sizes to measure')
+    parser.add_argument('--measure', nargs = 2, metavar = ('LAYOUT', 'SIZE'), help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], int(args.measure[1]))))
+        return
+
+    columns = ('layout', 'stars', 'build_s', 'bytes_per_star', 'find_hit_ns', 'find_miss_ns', 'get_star_ns', 'get_star_by_hash_ns')
+    print(' '.join('{:>19}'.format(column) for column in columns))
+    for n in args.sizes:
+        for layout in LAYOUTS:
+            output = subprocess.check_output([sys.executable, __file__, '--measure', layout, str(n)])
+            result = json.loads(output.decode('utf-8'))
+            print(' '.join('{:>19.4g}'.format(result[column]) if isinstance(result[column], float) else
+                           '{:>19}'.format(result[column]) for column in columns))
+
+
+if __name__ == '__main__':
+    main()
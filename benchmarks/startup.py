@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""Measure the startup of a short-lived worker: from a fresh
+interpreter to its first solved frame.
+
+Each run starts a new interpreter which, like a starlib.batch worker,
+imports starlib, makes a Camera (with its configuration cached), reads
+a prepared catalog snapshot and constellations, makes a Solver, and
+then finds the stars in one synthetic frame (from starlib.synthetic,
+saved as a PNG with its median image) and solves it. Each step is
+timed, and the medians over --repeat runs are reported:
+
+    import_starlib   import starlib
+    import_camera    from starlib import Camera (NumPy and the
+                     extension)
+    camera           Camera() from the cached configuration
+    catalog          snapshot.read() of the filtered catalog
+    constellations   ConstellationDatabase.load()
+    solver           Solver()
+    first_image      the first Image (importing OpenCV, reading the
+                     median image and decoding the frame)
+    first_solve      solving it, lost in space
+    config_yaml      for comparison, read_config() without the cache
+                     (importing ruamel.yaml and parsing)
+    process          the whole run, as seen from outside, including
+                     starting and stopping the interpreter
+
+The import-time breakdown is from one more run with python -X
+importtime: the cumulative time of each top-level module imported by
+the end of the first solve, largest first (including the few this
+script imports itself).
+
+Usage:
+
+    python benchmarks/startup.py [--repeat 5] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+# Everything else is imported by main(), so that a run imports only
+# what it measures (and these).
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+STEPS = ('import_starlib', 'import_camera', 'camera', 'catalog', 'constellations',
+         'solver', 'first_image', 'first_solve', 'config_yaml')
+GAIN  = 3e-3 # see suite.py
+
+
+def child(work_dir, config, snapshot_path, constellations_path, frame, time_budget):
+    """One worker's startup; prints the time of each step as JSON."""
+    timings = {}
+    last    = [time.perf_counter()]
+    def step(name):
+        now = time.perf_counter()
+        timings[name] = now - last[0]
+        last[0] = now
+
+    import starlib
+    step('import_starlib')
+    from starlib import Camera
+    step('import_camera')
+    camera = Camera(config, cache_dir = work_dir)
+    step('camera')
+    from starlib import snapshot
+    database, tree = snapshot.read(snapshot_path)
+    step('catalog')
+    constellations = starlib.ConstellationDatabase.load(constellations_path, database)
+    step('constellations')
+    from starlib.solver import Solver
+    solver = Solver(camera, database, constellations, time_budget = time_budget, tree = tree)
+    step('solver')
+    image = starlib.Image(camera, 0.0, frame)
+    step('first_image')
+    solution = solver.solve(image.stars)
+    step('first_solve')
+    from starlib.camera import read_config
+    read_config(config)
+    step('config_yaml')
+    print(json.dumps({'timings': timings, 'solved': bool(solution.solved)}))
+
+
+def prepare(work_dir, camera_filename, year, stop_after):
+    """Make everything a worker reads (untimed): a camera configuration
+    using a synthetic median image, its cached parse, a catalog
+    snapshot, constellations and a frame."""
+    import cv2
+    from starlib import Camera, batch
+    from starlib.camera import read_config
+    from starlib.synthetic import FrameGenerator
+
+    camera = Camera(camera_filename)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        snapshot_path, constellations_path = batch.prepare(camera, year, work_dir, stop_after = stop_after)
+        db = camera.load_catalog(year, stop_after = stop_after)
+    generator = FrameGenerator(camera, db, gain = GAIN, max_stars = 30)
+    frames, _ = generator.render(generator.random_attitudes(1))
+    frame  = os.path.join(work_dir, 'frame.png')
+    median = os.path.join(work_dir, 'median.png')
+    cv2.imwrite(frame, frames[0])
+    cv2.imwrite(median, generator.median_image())
+
+    config = os.path.join(work_dir, 'camera.yml')
+    with open(camera_filename) as f, open(config, 'w') as g:
+        g.writelines(line for line in f if not line.startswith('median_image_path:'))
+        g.write("median_image_path: '{}'\n".format(median))
+    read_config(config, work_dir)
+    return config, snapshot_path, constellations_path, frame
+
+
+def import_times(stderr, n = 10):
+    """The n top-level modules taking longest to import (cumulative
+    us), from the output of python -X importtime."""
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('   '): # top level (nested imports are indented further)
+            times.append((name.strip(), int(cumulative)))
+    return sorted(times, key = lambda item: -item[1])[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--camera', default = 'cameras/science_cam.yml')
+    parser.add_argument('--year', type = float, default = 2020)
+    parser.add_argument('--stop-after', type = int, default = 118219)
+    parser.add_argument('--repeat', type = int, default = 5)
+    parser.add_argument('--time-budget', type = float, default = 2.0)
+    parser.add_argument('--output', help = 'JSON file to write the results to')
+    parser.add_argument('--child', nargs = 5, help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child, time_budget = args.time_budget)
+        return
+
+    import shutil
+    import subprocess
+    import tempfile
+    import numpy as np
+
+    work_dir = tempfile.mkdtemp(prefix = 'startup-')
+    try:
+        paths   = prepare(work_dir, args.camera, args.year, args.stop_after)
+        command = [sys.executable, os.path.abspath(__file__), '--time-budget', str(args.time_budget), '--child', work_dir] + list(paths)
+
+        runs, processes = [], []
+        for ii in range(args.repeat):
+            start = time.perf_counter()
+            output = subprocess.run(command, check = True, stdout = subprocess.PIPE, cwd = ROOT, universal_newlines = True).stdout
+            processes.append(time.perf_counter() - start)
+            runs.append(json.loads(output.splitlines()[-1]))
+        traced = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:], check = True,
+                                stdout = subprocess.PIPE, stderr = subprocess.PIPE, cwd = ROOT, universal_newlines = True)
+    finally:
+        shutil.rmtree(work_dir)
+
+    medians = {name: float(np.median([run['timings'][name] for run in runs])) for name in STEPS}
+    medians['process'] = float(np.median(processes))
+    imports = import_times(traced.stderr)
+
+    print('{} runs, {} cpus, solved {}/{}'.format(args.repeat, os.cpu_count(), sum(run['solved'] for run in runs), len(runs)))
+    print('{:<16} {:>10}'.format('step', 'median_ms'))
+    for name, seconds in medians.items():
+        print('{:<16} {:>10.2f}'.format(name, seconds * 1000))
+    print('{:<32} {:>10}'.format('module', 'import_ms'))
+    for name, us in imports:
+        print('{:<32} {:>10.2f}'.format(name, us / 1000.0))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'median_s': medians,
+                       'runs':     runs,
+                       'imports':  dict(imports),
+                       'cpus':     os.cpu_count()}, f, indent = 2)
+
+
+if __name__ == '__main__':
+    main()
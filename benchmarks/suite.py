@@ -0,0 +1,433 @@
+#!/usr/bin/env python
+"""Run the benchmark suite, save the results as JSON, and compare them
+against a baseline.
+
+Every workload has a fixed seed, so runs on the same machine measure
+the same work:
+
+    load_catalog_full      Camera.load_catalog() of the whole catalog
+    load_catalog_20k       the same, stopping after catalog index 20000
+    kdtree_sort            KDTree.sort() of a tree of the whole catalog
+    kdtree_search_*deg     200 KDTree.search() calls, one at a time,
+                           around random points, at each radius
+    kdtree_search_batch    the same 200 searches (4 degrees) in one
+                           KDTree.search_batch() call
+    kdtree_search_threads_*
+                           800 KDTree.search() calls (16 degrees) on one
+                           shared tree, split between 1 and 4 Python
+                           threads (which search in parallel, without
+                           the GIL; compare the time per search)
+    angular_distances      angles from 30 stars to every catalog star,
+                           one star at a time
+    cross_angular_distances
+                           angles from 30 stars to 5000 catalog stars
+                           in one call
+    image_samples          Image of each bundled sample frame (decoding
+                           included)
+    image_synthetic_*      Image of synthetic frames (already decoded)
+                           at the resolution of each camera in cameras/
+    synthetic_frames_flircam
+                           rendering a batch of 4096 x 3000 synthetic
+                           frames (see starlib.synthetic)
+    solve_samples          Camera.solve() of each sample frame
+    solve_synthetic        Camera.solve() of a slewing sequence of
+                           synthetic frames, tracking from frame to frame
+
+The synthetic frames are made by starlib.synthetic, from the whole
+catalog; solve_synthetic also reports the fraction of frames solved
+and the median attitude error (arcsec). Note that the sample frames
+only solve with the real Hipparcos catalog in data/hip_main.dat; if
+they don't, each uses the solver's whole time budget.
+
+Each benchmark runs in a fresh interpreter, untimed setup first. Its
+workload is run once to warm up and then --repeat times, and the
+median, minimum and mean times are reported, with the time per item
+(per search, frame, etc.). Memory is the peak resident set size (RSS)
+during the timed runs, and its growth over the RSS after the warm-up
+run (the memory a run needs beyond what stays allocated between runs).
+The peak can only be reset on Linux; elsewhere it is the peak of the
+whole process, and there is no growth.
+
+With --baseline (the JSON output of an earlier run), a benchmark whose
+median time or peak growth is more than --threshold (a fraction)
+above the baseline's is reported as a regression, and the exit status
+is 1. Growths under 1 MB are not compared.
+
+Usage:
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json --threshold 0.2 [--only kdtree_sort ...]
+"""
+
+import argparse
+import collections
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SCIENCE_CAM = 'cameras/science_cam.yml'
+FLIRCAM     = 'cameras/flircam_jan2020.yml'
+SAMPLES     = 'images/science_cam_2018-05-08_50ms_gain40/samples'
+YEAR        = 2020
+SEED        = 0
+MIN_GROWTH  = 1 << 20 # bytes; smaller growths are not compared
+# Gain of the synthetic frames: the stars of the synthetic catalog in
+# data/ are so bright that at a gain of 1 all those in view saturate.
+GAIN        = 3e-3
+
+
+def status(field):
+    """A memory field of /proc/self/status (e.g. VmRSS), in bytes, or
+    None if there is no such file."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak():
+    """Reset the peak RSS (Linux only); returns whether it was."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    peak = status('VmHWM')
+    if peak is None:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak *= 1 if sys.platform == 'darwin' else 1024 # bytes on macOS, kB on Linux
+    return peak
+
+
+def camera(filename):
+    from starlib import Camera
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore') # no median image
+        return Camera(filename)
+
+
+def catalog(cam, stop_after = 118219):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore') # unreadable catalog entries
+        return cam.load_catalog(YEAR, stop_after = stop_after)
+
+
+# Each benchmark does its (untimed) setup and returns a Workload: run
+# is timed, items is the number of things it does (for the time per
+# item), prepare, if given, is called (untimed) before each run and its
+# result passed to run, and report, if given, is called after the runs
+# for a dict of other results.
+Workload = collections.namedtuple('Workload', ('run', 'items', 'prepare', 'report'))
+Workload.__new__.__defaults__ = (1, None, None)
+
+BENCHMARKS = collections.OrderedDict()
+
+def benchmark(name, repeat = None):
+    def register(setup):
+        BENCHMARKS[name] = (setup, repeat)
+        return setup
+    return register
+
+
+@benchmark('load_catalog_full', repeat = 3)
+def load_catalog_full():
+    cam = camera(SCIENCE_CAM)
+    return Workload(lambda: catalog(cam))
+
+@benchmark('load_catalog_20k')
+def load_catalog_20k():
+    cam = camera(SCIENCE_CAM)
+    return Workload(lambda: catalog(cam, stop_after = 20000))
+
+@benchmark('kdtree_sort')
+def kdtree_sort():
+    from starlib import KDTree
+    cam = camera(SCIENCE_CAM)
+    db  = catalog(cam)
+    return Workload(lambda tree: tree.sort(), prepare = lambda: KDTree(db, cam.kdbucket_size))
+
+
+def search_workload(radius_degrees, batch = False, searches = 200):
+    from starlib import KDTree
+    cam  = camera(SCIENCE_CAM)
+    db   = catalog(cam)
+    tree = KDTree(db, cam.kdbucket_size)
+    tree.sort()
+    queries = np.random.RandomState(SEED).normal(size = (searches, 3))
+    queries = (queries / np.linalg.norm(queries, axis = 1)[:,None]).astype(np.float32)
+    radius  = float(2 * np.sin(np.radians(radius_degrees) / 2)) # chord
+
+    if batch:
+        return Workload(lambda: tree.search_batch(queries, radius), searches)
+    def run():
+        for x, y, z in queries.tolist():
+            tree.search(x, y, z, radius, 0.0)
+    return Workload(run, searches)
+
+for _degrees in (1, 4, 16):
+    benchmark('kdtree_search_{}deg'.format(_degrees))(lambda degrees = _degrees: search_workload(degrees))
+benchmark('kdtree_search_batch')(lambda: search_workload(4, batch = True))
+
+
+def threaded_search_workload(threads, radius_degrees = 16, searches = 800):
+    import threading
+    from starlib import KDTree
+    cam  = camera(SCIENCE_CAM)
+    db   = catalog(cam)
+    tree = KDTree(db, cam.kdbucket_size)
+    tree.sort()
+    queries = np.random.RandomState(SEED).normal(size = (searches, 3))
+    queries = (queries / np.linalg.norm(queries, axis = 1)[:,None]).tolist()
+    radius  = float(2 * np.sin(np.radians(radius_degrees) / 2))
+
+    def search(part):
+        for x, y, z in part:
+            tree.search(x, y, z, radius, 0.0)
+    def run():
+        workers = [threading.Thread(target = search, args = (queries[ii::threads],)) for ii in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return Workload(run, searches, report = lambda: {'threads': threads, 'cpus': os.cpu_count()})
+
+for _threads in (1, 4):
+    benchmark('kdtree_search_threads_{}'.format(_threads))(lambda threads = _threads: threaded_search_workload(threads))
+
+
+def distance_workload(cross):
+    from starlib import starlib
+    db        = catalog(camera(SCIENCE_CAM))
+    positions = np.array(db.positions)
+    origins   = positions[np.random.RandomState(SEED).randint(0, len(positions), 30)]
+    if cross: # as from the stars of an image to a catalog subset
+        subset = positions[:5000]
+        return Workload(lambda: starlib.cross_angular_distances(origins, subset), len(origins) * len(subset))
+    def run():
+        for origin in origins:
+            starlib.angular_distances(origin, positions)
+    return Workload(run, len(origins) * len(positions))
+
+benchmark('angular_distances')(lambda: distance_workload(False))
+benchmark('cross_angular_distances')(lambda: distance_workload(True))
+
+
+@benchmark('image_samples')
+def image_samples():
+    from starlib import Image
+    cam       = camera(SCIENCE_CAM)
+    filenames = sorted(glob.glob(os.path.join(SAMPLES, '*.png')))
+    def run():
+        for filename in filenames:
+            Image(cam, 0.0, filename)
+    return Workload(run, len(filenames))
+
+
+def synthetic_image_workload(camera_filename, frames = 5):
+    from starlib import Image
+    from starlib.synthetic import FrameGenerator
+    cam       = camera(camera_filename)
+    db        = catalog(cam)
+    generator = FrameGenerator(cam, db, gain = GAIN, seed = SEED)
+    cam.set_median_image(generator.median_image())
+    images, _ = generator.render(generator.random_attitudes(frames))
+    def run():
+        for image in images:
+            Image(cam, 0.0, image)
+    return Workload(run, frames)
+
+benchmark('image_synthetic_science_cam')(lambda: synthetic_image_workload(SCIENCE_CAM))
+benchmark('image_synthetic_flircam')(lambda: synthetic_image_workload(FLIRCAM))
+
+
+@benchmark('synthetic_frames_flircam')
+def synthetic_frames_flircam(frames = 8):
+    from starlib.synthetic import FrameGenerator
+    cam       = camera(FLIRCAM)
+    db        = catalog(cam)
+    generator = FrameGenerator(cam, db, gain = GAIN, seed = SEED)
+    return Workload(lambda: generator.render(generator.random_attitudes(frames)), frames)
+
+
+def solver(cam, time_budget = 0.05):
+    from starlib.solver import Solver
+    return Solver(cam, cam.filter_catalog(catalog(cam)), time_budget = time_budget)
+
+@benchmark('solve_samples', repeat = 3)
+def solve_samples():
+    cam       = camera(SCIENCE_CAM)
+    solve     = solver(cam)
+    filenames = sorted(glob.glob(os.path.join(SAMPLES, '*.png')))
+    def run(_):
+        for filename in filenames:
+            cam.solve(filename, solve)
+    return Workload(run, len(filenames), lambda: setattr(cam, 'previous_solution', None))
+
+@benchmark('solve_synthetic', repeat = 3)
+def solve_synthetic(frames = 10, pixels_per_frame = 3.0):
+    from starlib.synthetic import FrameGenerator
+    cam       = camera(SCIENCE_CAM)
+    solve     = solver(cam, time_budget = 2.0) # for the first, lost-in-space, frame
+    db        = catalog(cam)
+    generator = FrameGenerator(cam, db, gain = GAIN, max_stars = 30, seed = SEED) # as many stars as in test_solver
+    cam.set_median_image(generator.median_image())
+
+    # Slew about the camera's z axis (sideways across the image).
+    angle = pixels_per_frame * cam.pixel_x_tangent
+    step  = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+    rotations = [generator.random_attitudes(1)[0]]
+    for ii in range(frames - 1):
+        rotations.append(rotations[-1] @ step)
+    images, truths = generator.render(rotations)
+
+    errors = []
+    def run(_):
+        for image, truth in zip(images, truths):
+            _, solution = cam.solve(image, solve)
+            errors.append(truth.attitude_error(solution.rotation) if solution.solved else np.nan)
+    def report():
+        return {'solved_fraction':     float(np.mean(np.isfinite(errors))),
+                'median_error_arcsec': float(np.degrees(np.nanmedian(errors)) * 3600) if np.any(np.isfinite(errors)) else None}
+    return Workload(run, frames, lambda: setattr(cam, 'previous_solution', None), report)
+
+
+def measure(name, repeat):
+    """Run one benchmark in this interpreter; returns a dict of
+    results."""
+    setup, default_repeat = BENCHMARKS[name]
+    repeat   = repeat or default_repeat or 5
+    workload = setup()
+
+    def once():
+        if workload.prepare is None:
+            start = time.perf_counter()
+            workload.run()
+        else:
+            arg   = workload.prepare()
+            start = time.perf_counter()
+            workload.run(arg)
+        return time.perf_counter() - start
+
+    once() # warm up
+    rss   = status('VmRSS')
+    reset = reset_peak()
+    seconds = [once() for ii in range(repeat)]
+    peak  = peak_rss()
+    return {'seconds':           seconds,
+            'median_s':          float(np.median(seconds)),
+            'min_s':             float(np.min(seconds)),
+            'mean_s':            float(np.mean(seconds)),
+            'items':             workload.items,
+            'median_per_item_s': float(np.median(seconds)) / workload.items,
+            'peak_rss_bytes':    peak,
+            'peak_growth_bytes': peak - rss if reset and rss is not None else None,
+            'report':            workload.report() if workload.report is not None else {}}
+
+
+def machine():
+    import cv2
+    return {'platform': platform.platform(),
+            'python':   platform.python_version(),
+            'numpy':    np.__version__,
+            'opencv':   cv2.__version__,
+            'cpus':     os.cpu_count()}
+
+
+def compare(results, baseline, threshold):
+    """Names of the benchmarks in both results and baseline which
+    regressed, and a line of comparison for each such benchmark."""
+    regressions, lines = [], []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base  = baseline[name]
+        ratio = result['median_s'] / base['median_s']
+        worse = ratio > 1 + threshold
+        line  = '{:<28} time {:>7.2f}x'.format(name, ratio)
+        growth, base_growth = result.get('peak_growth_bytes'), base.get('peak_growth_bytes')
+        if growth is not None and base_growth is not None and max(growth, base_growth) >= MIN_GROWTH:
+            memory_ratio = growth / float(max(base_growth, MIN_GROWTH))
+            worse = worse or memory_ratio > 1 + threshold
+            line += '  memory {:>7.2f}x'.format(memory_ratio)
+        if worse:
+            regressions.append(name)
+            line += '  REGRESSION'
+        lines.append(line)
+    return regressions, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--only', nargs = '+', metavar = 'NAME', help = 'benchmarks to run (default: all)')
+    parser.add_argument('--repeat', type = int, help = 'timed runs of each workload (default: 5, or 3 for slow ones)')
+    parser.add_argument('--output', help = 'save the results to this JSON file')
+    parser.add_argument('--baseline', help = 'JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type = float, default = 0.1,
+                        help = 'fraction above the baseline counted as a regression (default: 0.1)')
+    parser.add_argument('--list', action = 'store_true', help = 'list the benchmarks and exit')
+    parser.add_argument('--measure', metavar = 'NAME', help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.repeat)))
+        return 0
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    names = args.only or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error('no benchmark named {} (see --list)'.format(name))
+
+    root    = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    results = collections.OrderedDict()
+    print('{:<28} {:>10} {:>10} {:>14} {:>10}'.format('benchmark', 'median_ms', 'min_ms', 'per_item_ms', 'growth_MB'))
+    for name in names:
+        command = [sys.executable, os.path.abspath(__file__), '--measure', name]
+        if args.repeat:
+            command += ['--repeat', str(args.repeat)]
+        output = subprocess.check_output(command, cwd = root)
+        result = results[name] = json.loads(output.decode('utf-8').splitlines()[-1])
+        growth = result['peak_growth_bytes']
+        print('{:<28} {:>10.2f} {:>10.2f} {:>14.4g} {:>10}'.format(
+            name, result['median_s'] * 1000, result['min_s'] * 1000, result['median_per_item_s'] * 1000,
+            '-' if growth is None else '{:.1f}'.format(growth / 1e6)) +
+              ''.join('  {}={:.4g}'.format(key, value) for key, value in result['report'].items() if value is not None))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'machine': machine(), 'seed': SEED, 'benchmarks': results}, f, indent = 2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions, lines = compare(results, baseline['benchmarks'], args.threshold)
+        print('\nagainst {} (threshold {:.0%}):'.format(args.baseline, args.threshold))
+        print('\n'.join(lines))
+        if regressions:
+            print('{} regression(s): {}'.format(len(regressions), ' '.join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""Compare per-frame solve time when tracking from the previous frame
+against a lost-in-space solve of every frame.
+
+By default this uses a synthetic sequence: the catalog stars in view
+of a camera slewing at a steady rate, projected into pixels with some
+noise and a few false stars. With --images, it solves a directory of
+images instead (in name order), which needs the real Hipparcos catalog
+in data/hip_main.dat.
+
+Usage:
+
+    python benchmarks/tracking.py [--frames 50] [--pixels-per-frame 3]
+    python benchmarks/tracking.py --images images/science_cam_2018-05-08_50ms_gain40/samples
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def project(camera, db, rotation, rng, n = 30, false_stars = 2):
+    """Image StarDatabase of the n brightest catalog stars in view."""
+    from starlib import StarDatabase, Star
+
+    v  = db.positions.astype(np.float64) @ rotation
+    px = v[:,1] / (v[:,0] * camera.pixel_x_tangent)
+    py = v[:,2] / (v[:,0] * camera.pixel_y_tangent)
+    visible = np.nonzero((v[:,0] > 0) & (np.abs(px) < camera.image_width / 2) & (np.abs(py) < camera.image_height / 2))[0]
+    visible = visible[np.argsort(-db.fluxes[visible])][:n]
+
+    stars = StarDatabase()
+    for ii in visible:
+        stars += Star(camera.pixel_x_tangent, camera.pixel_y_tangent, camera.image_variance,
+                      px[ii] + rng.normal(scale = 0.3), py[ii] + rng.normal(scale = 0.3), 100.0, -1)
+    for ii in range(false_stars):
+        stars += Star(camera.pixel_x_tangent, camera.pixel_y_tangent, camera.image_variance,
+                      rng.uniform(-camera.image_width / 2, camera.image_width / 2),
+                      rng.uniform(-camera.image_height / 2, camera.image_height / 2), 200.0, -1)
+    return stars
+
+
+def synthetic_frames(camera, db, frames, pixels_per_frame, seed):
+    rng = np.random.default_rng(seed)
+    q   = rng.normal(size = 4)
+    w, x, y, z = q / np.linalg.norm(q)
+    rotation = np.array([[1 - 2 * (y*y + z*z), 2 * (x*y - w*z),     2 * (x*z + w*y)],
+                         [2 * (x*y + w*z),     1 - 2 * (x*x + z*z), 2 * (y*z - w*x)],
+                         [2 * (x*z - w*y),     2 * (y*z + w*x),     1 - 2 * (x*x + y*y)]])
+    # Slew about the camera's z axis (sideways across the image).
+    angle = pixels_per_frame * camera.pixel_x_tangent
+    step  = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+    for ii in range(frames):
+        yield project(camera, db, rotation, rng)
+        rotation = rotation @ step
+
+
+def report(name, seconds):
+    seconds = np.asarray(seconds) * 1000
+    print('{:<14} {:>6} {:>10.2f} {:>10.2f} {:>10.2f}'.format(name, len(seconds), np.mean(seconds), np.median(seconds), np.max(seconds)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--camera', default = 'cameras/science_cam.yml')
+    parser.add_argument('--frames', type = int, default = 50)
+    parser.add_argument('--pixels-per-frame', type = float, default = 3.0)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--images', help = 'directory of images to solve instead of a synthetic sequence')
+    args = parser.parse_args()
+
+    from starlib import Camera, Image
+    from starlib.solver import Solver
+
+    camera = Camera(args.camera)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        db = camera.filter_catalog(camera.load_catalog(2020))
+    solver = Solver(camera, db)
+
+    if args.images:
+        filenames = sorted(glob.glob(os.path.join(args.images, '*.png')))
+        frames = [Image(camera, time.time(), filename).stars for filename in filenames]
+    else:
+        frames = list(synthetic_frames(camera, db, args.frames, args.pixels_per_frame, args.seed))
+
+    full, tracked, methods = [], [], []
+    previous = None
+    for stars in frames:
+        solution = solver.solve(stars)
+        full.append(solution.timings['total'])
+
+        solution = solver.solve(stars, previous)
+        if solution.solved:
+            tracked.append(solution.timings['total'])
+            methods.append(solution.method)
+        previous = solution if solution.solved else None
+
+    print('{:<14} {:>6} {:>10} {:>10} {:>10}'.format('mode', 'frames', 'mean_ms', 'median_ms', 'max_ms'))
+    report('lost_in_space', full)
+    report('with_tracking', tracked)
+    print('solved {} of {} frames; {} by tracking'.format(len(methods), len(frames), methods.count('tracking')))
+
+
+if __name__ == '__main__':
+    main()